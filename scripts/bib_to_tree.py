@@ -4,16 +4,30 @@
 from __future__ import annotations
 
 import argparse
+import calendar
+import os
+import re
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Iterable, List, Tuple, cast
+from typing import Dict, Iterable, Iterator, List, Tuple, cast
 
 try:
     import bibtexparser  # type: ignore[import]
-except ImportError as exc:  # pragma: no cover - runtime dependency
-    raise SystemExit(
-        "bibtexparser is required. Install it with `pip install bibtexparser`."
-    ) from exc
+except ImportError:  # pragma: no cover - only needed without --fast
+    bibtexparser = None
+
+
+_SLUG_NONALNUM = re.compile(r"[^a-z0-9]+")
+_SLUG_DASHES = re.compile(r"-+")
+_SLUG_TABLE = str.maketrans(
+    {
+        chr(code): "-"
+        for code in range(128)
+        if chr(code) not in "abcdefghijklmnopqrstuvwxyz0123456789"
+    }
+)
+WRITE_WORKERS = min(32, (os.cpu_count() or 1) * 4)
 
 
 # ----------------------------------------------------------------------------
@@ -23,76 +37,94 @@ except ImportError as exc:  # pragma: no cover - runtime dependency
 
 def _strip_braces(value: str) -> str:
     value = value.strip()
-    while value.startswith("{") and value.endswith("}") and len(value) > 1:
-        value = value[1:-1].strip()
-    return value
+    if not (value.startswith("{") and value.endswith("}")):
+        return value
+    start, end = 0, len(value)
+    while end - start > 1 and value[start] == "{" and value[end - 1] == "}":
+        start += 1
+        end -= 1
+        while start < end and value[start].isspace():
+            start += 1
+        while end > start and value[end - 1].isspace():
+            end -= 1
+    return value[start:end]
 
 
 def _clean_whitespace(value: str | None) -> str:
     if not value:
         return ""
-    flattened = " ".join(value.replace("\n", " ").split())
-    return _strip_braces(flattened)
+    return _strip_braces(" ".join(value.split()))
 
 
 def _format_authors(author_field: str | None) -> str | None:
-    raw = _clean_whitespace(author_field)
-    if not raw:
+    if not author_field:
         return None
-    authors = [part.strip() for part in raw.split(" and ") if part.strip()]
+    authors = [part.strip() for part in author_field.split(" and ") if part.strip()]
     if not authors:
         return None
     return ", ".join(authors)
 
 
 def _slugify(name: str) -> str:
-    import re
-
-    name = name.strip().lower()
-    name = _strip_braces(name)
-    name = re.sub(r"[^a-z0-9]+", "-", name)
-    name = re.sub(r"-+", "-", name).strip("-")
-    return name or "reference"
+    name = _strip_braces(name.strip().lower())
+    if name.isascii():
+        name = name.translate(_SLUG_TABLE)
+    else:
+        name = _SLUG_NONALNUM.sub("-", name)
+    return _SLUG_DASHES.sub("-", name).strip("-") or "reference"
+
+
+MONTH_NUMBERS = {
+    "jan": 1,
+    "feb": 2,
+    "mar": 3,
+    "apr": 4,
+    "may": 5,
+    "jun": 6,
+    "jul": 7,
+    "aug": 8,
+    "sep": 9,
+    "oct": 10,
+    "nov": 11,
+    "dec": 12,
+}
+DAYS_IN_MONTH = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
 
 
 def _parse_month(month: str | None) -> int:
     if not month:
         return 1
     month = month.strip().lower()
-    name_map = {
-        "jan": 1,
-        "feb": 2,
-        "mar": 3,
-        "apr": 4,
-        "may": 5,
-        "jun": 6,
-        "jul": 7,
-        "aug": 8,
-        "sep": 9,
-        "sept": 9,
-        "oct": 10,
-        "nov": 11,
-        "dec": 12,
-    }
     if month.isdigit():
         value = int(month)
         if 1 <= value <= 12:
             return value
-    return name_map.get(month[:3], 1)
+    return MONTH_NUMBERS.get(month[:3], 1)
 
 
 def _format_date(entry: Dict[str, str]) -> str | None:
-    year = _clean_whitespace(entry.get("year"))
+    year = entry.get("year")
     if not year:
         return None
-    month = _parse_month(_clean_whitespace(entry.get("month")))
-    day = _clean_whitespace(entry.get("day"))
+    if not (len(year) == 4 and year.isascii() and year.isdigit()):
+        try:
+            year = f"{int(year):04d}"
+        except ValueError:
+            return None
+    month = _parse_month(entry.get("month"))
+    day = entry.get("day")
     try:
         day_value = int(day) if day else 1
     except ValueError:
         day_value = 1
-    day_value = min(max(day_value, 1), 31)
-    return f"{int(year):04d}-{month:02d}-{day_value:02d}"
+    if day_value > 28:
+        month_days = DAYS_IN_MONTH[month - 1]
+        if month == 2 and calendar.isleap(int(year)):
+            month_days += 1
+        day_value = min(day_value, month_days)
+    elif day_value < 1:
+        day_value = 1
+    return f"{year}-{month:02d}-{day_value:02d}"
 
 
 def _strip_url_command(value: str) -> str:
@@ -107,68 +139,266 @@ def _escape_meta_value(value: str) -> str:
 
 
 URL_FIELDS = {"url", "howpublished", "external"}
+META_SKIP_FIELDS = {"title", "author", "year", "month", "day"}
 
 
 def _meta_pairs(entry: Dict[str, str]) -> Iterable[Tuple[str, str]]:
-    skip = {"title", "author", "year", "month", "day"}
-
     for field, value in entry.items():
-        if field in skip:
+        if not value or field in META_SKIP_FIELDS:
             continue
-        cleaned = _clean_whitespace(value)
-        if cleaned:
-            meta_key = "external" if field.lower() in URL_FIELDS else field
-            if meta_key == "external":
-                cleaned = _strip_url_command(cleaned)
-            yield meta_key, _escape_meta_value(cleaned)
+        if field.lower() in URL_FIELDS:
+            yield "external", _escape_meta_value(_strip_url_command(value))
+        else:
+            yield field, _escape_meta_value(value)
 
 
 # ----------------------------------------------------------------------------
-# Core conversion
+# Fast scanner
 # ----------------------------------------------------------------------------
 
 
-def build_tree_content(entry: Dict[str, str]) -> str:
-    title = _clean_whitespace(entry.get("title")) or "Untitled"
-    lines: List[str] = [f"\\title{{{title}}}", "\\taxon{Reference}"]
+SCANNER_SKIP_TYPES = {"comment", "preamble"}
+CITEKEY_FORBIDDEN = set('{}()="#@')
+
+
+def _is_escaped(text: str, pos: int) -> bool:
+    return pos > 0 and text[pos - 1] == "\\"
+
+
+def _match_brace(text: str, start: int) -> int:
+    """Return the index just past the brace group opened at ``start``.
+
+    Escaped braces (``\\{`` and ``\\}``) are literal text and do not nest.
+    """
+    depth = 0
+    pos = start
+    while True:
+        close = text.find("}", pos)
+        if close == -1:
+            raise ValueError(f"unbalanced braces starting at offset {start}")
+        opened = text.find("{", pos, close)
+        if opened != -1:
+            if not _is_escaped(text, opened):
+                depth += 1
+            pos = opened + 1
+            continue
+        pos = close + 1
+        if _is_escaped(text, close):
+            continue
+        depth -= 1
+        if depth == 0:
+            return pos
+
+
+def _match_quote(text: str, start: int) -> int:
+    """Return the index of the quote closing the string opened at ``start``."""
+    depth = 0
+    for pos in range(start + 1, len(text)):
+        char = text[pos]
+        if char in "{}" and _is_escaped(text, pos):
+            continue
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+        elif char == '"' and depth == 0:
+            return pos
+    raise ValueError(f"unterminated string starting at offset {start}")
+
+
+def _match_paren(text: str, start: int) -> int:
+    """Return the index just past the parenthesis opened at ``start``."""
+    depth = 0
+    pos = start
+    while pos < len(text):
+        char = text[pos]
+        if char == "{":
+            pos = _match_brace(text, pos)
+            continue
+        if char == '"':
+            pos = _match_quote(text, pos) + 1
+            continue
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                return pos + 1
+        pos += 1
+    raise ValueError(f"unbalanced parentheses starting at offset {start}")
+
+
+def _skip_space(text: str, pos: int) -> int:
+    while pos < len(text) and text[pos].isspace():
+        pos += 1
+    return pos
+
+
+def _scan_fields(body: str, macros: Dict[str, str]) -> List[Tuple[str, str]]:
+    fields: List[Tuple[str, str]] = []
+    pos = 0
+    while True:
+        equals = body.find("=", pos)
+        if equals == -1:
+            return fields
+        name = body[pos:equals].strip().lower()
+        pieces: List[str] = []
+        pos = equals + 1
+        while True:
+            pos = _skip_space(body, pos)
+            if pos >= len(body):
+                break
+            if body[pos] == "{":
+                end = _match_brace(body, pos)
+                pieces.append(body[pos + 1 : end - 1])
+                pos = end
+            elif body[pos] == '"':
+                end = _match_quote(body, pos)
+                pieces.append(body[pos + 1 : end])
+                pos = end + 1
+            else:
+                end = len(body)
+                for stop in (",", "#"):
+                    found = body.find(stop, pos, end)
+                    if found != -1:
+                        end = found
+                token = body[pos:end].strip()
+                pieces.append(macros.get(token.lower(), token))
+                pos = end
+            pos = _skip_space(body, pos)
+            if pos < len(body) and body[pos] == "#":
+                pos += 1
+                continue
+            break
+        fields.append((name, "".join(pieces)))
+        comma = body.find(",", pos)
+        if comma == -1:
+            return fields
+        pos = comma + 1
+
+
+def _is_citekey(key: str) -> bool:
+    return bool(key) and not any(
+        char.isspace() or char in CITEKEY_FORBIDDEN for char in key
+    )
 
-    authors = _format_authors(entry.get("author"))
-    if authors:
-        lines.append(f"\\author/literal{{{authors}}}")
 
-    date_value = _format_date(entry)
-    if date_value:
-        lines.append(f"\\date{{{date_value}}}")
+def _scan_bib(text: str) -> Iterator[Dict[str, str]]:
+    """Yield entries from ``text`` in the shape produced by bibtexparser.
+
+    Only ``@type{key, field = value, ...}`` entries (or their parenthesised
+    form) and ``@string`` macros are understood; ``@comment`` and
+    ``@preamble`` blocks and entries without fields are skipped. As in
+    BibTeX, an ``@word`` that is not followed by a citekey and a comma is
+    treated as comment text. Output matches bibtexparser on well-formed
+    input only.
+    """
+    macros: Dict[str, str] = {}
+    pos = text.find("@")
+    while pos != -1:
+        brace = text.find("{", pos)
+        paren = text.find("(", pos, brace if brace != -1 else len(text))
+        opened = paren if paren != -1 else brace
+        if opened == -1:
+            return
+        entry_type = text[pos + 1 : opened].strip().lower()
+        if not entry_type.isalnum():
+            pos = text.find("@", pos + 1)
+            continue
+        match_close = _match_paren if opened == paren else _match_brace
+        if entry_type in SCANNER_SKIP_TYPES or entry_type == "string":
+            end = match_close(text, opened)
+            if entry_type == "string":
+                macros.update(_scan_fields(text[opened + 1 : end - 1], macros))
+            pos = text.find("@", end)
+            continue
 
-    for key, value in _meta_pairs(entry):
-        if value:
-            lines.append(f"\\meta{{{key}}}{{{value}}}")
+        comma = text.find(",", opened)
+        citekey = text[opened + 1 : comma].strip() if comma != -1 else ""
+        if not _is_citekey(citekey):
+            pos = text.find("@", pos + 1)
+            continue
+        end = match_close(text, opened)
+        rest = text[comma + 1 : end - 1]
+        pos = text.find("@", end)
+        fields = _scan_fields(rest, macros)
+        if not fields:
+            continue
+        # bibtexparser lists fields last-to-first, followed by type and key.
+        entry = dict(reversed(fields))
+        entry["ENTRYTYPE"] = entry_type
+        entry["ID"] = citekey
+        yield entry
+
+
+# ----------------------------------------------------------------------------
+# Core conversion
+# ----------------------------------------------------------------------------
 
+
+def build_tree_content(entry: Dict[str, str]) -> str:
+    cleaned = {field: _clean_whitespace(value) for field, value in entry.items()}
+    title = cleaned.get("title") or "Untitled"
+    authors = _format_authors(cleaned.get("author"))
+    date_value = _format_date(cleaned)
+
+    lines: List[str] = [f"\\title{{{title}}}", "\\taxon{Reference}"]
+    lines += [f"\\author/literal{{{authors}}}"] if authors else []
+    lines += [f"\\date{{{date_value}}}"] if date_value else []
+    lines += [
+        f"\\meta{{{key}}}{{{value}}}" for key, value in _meta_pairs(cleaned) if value
+    ]
     lines.append("")
     return "\n".join(lines)
 
 
-def convert_bibtex(source: Path, output_dir: Path, overwrite: bool) -> List[Path]:
-    data = bibtexparser.loads(source.read_text())  # type: ignore[no-untyped-call]
-    entries = cast(List[Dict[str, str]], data.entries)  # type: ignore[attr-defined]
-    if not entries:
-        raise SystemExit(f"No BibTeX entries found in {source}")
+def _write_tree(job: Tuple[Path, Dict[str, str]]) -> Path:
+    target, entry = job
+    target.write_text(build_tree_content(entry), encoding="utf-8")
+    return target
 
-    created_paths: List[Path] = []
 
-    for entry in entries:
-        citekey = entry.get("ID") or _slugify(entry.get("title", "reference"))
-        filename = f"{_slugify(citekey)}.tree"
-        target = output_dir / filename
-        if target.exists() and not overwrite:
+def _scan_source(source: Path) -> Iterator[Dict[str, str]]:
+    try:
+        yield from _scan_bib(source.read_text(encoding="utf-8"))
+    except ValueError as exc:
+        raise SystemExit(f"Malformed BibTeX in {source}: {exc}") from exc
+
+
+def _load_entries(source: Path, fast: bool) -> Iterable[Dict[str, str]]:
+    if fast:
+        return _scan_source(source)
+    if bibtexparser is None:
+        raise SystemExit(
+            "bibtexparser is required. Install it with `pip install bibtexparser`"
+            " or pass --fast."
+        )
+    with source.open(encoding="utf-8") as stream:
+        data = bibtexparser.load(stream)  # type: ignore[no-untyped-call]
+    return cast(List[Dict[str, str]], data.entries)  # type: ignore[attr-defined]
+
+
+def convert_bibtex(
+    source: Path, output_dir: Path, overwrite: bool, fast: bool = False
+) -> Iterator[Path]:
+    # Check every target before writing any, so a refusal leaves the output
+    # directory untouched. Paths are only yielded once this pass is done.
+    pending: Dict[Path, Dict[str, str]] = {}
+
+    for entry in _load_entries(source, fast):
+        citekey = entry.get("ID") or entry.get("title", "reference")
+        target = output_dir / f"{_slugify(citekey)}.tree"
+        if not overwrite and (target in pending or target.exists()):
             raise SystemExit(
                 f"Refusing to overwrite existing file {target}. Use --overwrite to replace."
             )
-        target.parent.mkdir(parents=True, exist_ok=True)
-        target.write_text(build_tree_content(entry))
-        created_paths.append(target)
+        pending[target] = entry
+    if not pending:
+        raise SystemExit(f"No BibTeX entries found in {source}")
 
-    return created_paths
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=WRITE_WORKERS) as executor:
+        yield from executor.map(_write_tree, pending.items())
 
 
 # ----------------------------------------------------------------------------
@@ -194,6 +424,16 @@ def parse_args(argv: List[str]) -> argparse.Namespace:
         action="store_true",
         help="Overwrite existing reference tree files",
     )
+    parser.add_argument(
+        "--fast",
+        action="store_true",
+        help=(
+            "Use the built-in BibTeX scanner instead of bibtexparser. It is "
+            "faster on large files and matches bibtexparser on well-formed "
+            "input, but also keeps non-standard entry types and entries with "
+            "escaped braces"
+        ),
+    )
     return parser.parse_args(argv)
 
 
@@ -202,8 +442,9 @@ def main(argv: List[str] | None = None) -> int:
     if not args.source.is_file():
         raise SystemExit(f"BibTeX file {args.source} does not exist")
 
-    created = convert_bibtex(args.source, args.output_dir, args.overwrite)
-    for path in created:
+    for path in convert_bibtex(
+        args.source, args.output_dir, args.overwrite, args.fast
+    ):
         print(f"Created {path}")
     return 0
 
@@ -4,14 +4,13 @@
 from __future__ import annotations
 
 import argparse
+import os
 import sys
-from datetime import datetime
+from datetime import date
 from pathlib import Path
 import shutil
 import subprocess
-import re
 
-BASE36_STEM = re.compile(r"^[0-9a-zA-Z]{4}$")
 MAX_VALUE = 36**4 - 1
 BASE36_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
 
@@ -32,28 +31,29 @@ def parse_args() -> argparse.Namespace:
     return parser.parse_args()
 
 
-def to_base36(value: int, width: int = 4) -> str:
+def to_base36(value: int) -> str:
     if value < 0:
         raise ValueError("Negative values cannot be converted to base-36")
-    digits: list[str] = []
-    n = value
-    if n == 0:
-        digits.append("0")
-    else:
-        while n > 0:
-            n, rem = divmod(n, 36)
-            digits.append(BASE36_DIGITS[rem])
-    base36 = "".join(reversed(digits))
-    if len(base36) > width:
+    if value > MAX_VALUE:
         raise ValueError("Value exceeds allotted width for base-36 encoding")
-    return base36.rjust(width, "0")
+    d = BASE36_DIGITS
+    value, r0 = divmod(value, 36)
+    value, r1 = divmod(value, 36)
+    r3, r2 = divmod(value, 36)
+    return d[r3] + d[r2] + d[r1] + d[r0]
 
 
 def find_next_stem(tree_dir: Path) -> str:
     highest = -1
-    for tree_path in tree_dir.glob("*.tree"):
-        stem = tree_path.stem
-        if BASE36_STEM.fullmatch(stem):
+    with os.scandir(tree_dir) as entries:
+        for entry in entries:
+            name = entry.name
+            if len(name) != 9 or not name.endswith(".tree"):
+                continue
+            stem = name[:4]
+            # int() alone would also accept signs, underscores and whitespace.
+            if not (stem.isascii() and stem.isalnum()):
+                continue
             value = int(stem, 36)
             if value > highest:
                 highest = value
@@ -64,8 +64,7 @@ def find_next_stem(tree_dir: Path) -> str:
 
 
 def format_date_line() -> str:
-    now = datetime.now()
-    return now.strftime("\\date{%Y-%m-%d}")
+    return f"\\date{{{date.today().isoformat()}}}"
 
 
 def create_tree_file(tree_dir: Path) -> Path:
@@ -80,9 +79,7 @@ def create_tree_file(tree_dir: Path) -> Path:
         raise FileExistsError(f"Refusing to overwrite existing file: {target}")
 
     date_line = format_date_line()
-    target.write_text(f"{date_line}\n\n", encoding="utf-8")
-    with target.open("a", encoding="utf-8") as stream:
-        stream.write("\\import{base-macros}\n\n")
+    target.write_text(f"{date_line}\n\n\\import{{base-macros}}\n\n", encoding="utf-8")
     return target
 
 